@@ -5,118 +5,25 @@ Build script for creating EWI Long Tone Visualizer executables
 
 import os
 import sys
-import platform
-import subprocess
-import shutil
-from pathlib import Path
+import argparse
+import functools
+import hashlib
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def get_platform_info():
-    """Get platform-specific information"""
-    system = platform.system().lower()
-    if system == "darwin":
-        return "macos", ".app"
-    elif system == "windows":
-        return "windows", ".exe"
-    else:
-        return "linux", ""
+# Fingerprint of the inputs of the build currently in dist/
+FINGERPRINT_FILE = os.path.join("dist", ".fingerprint")
 
-def clean_build_dirs():
-    """Clean previous build directories"""
-    dirs_to_clean = ["build", "dist", "__pycache__"]
-    for dir_name in dirs_to_clean:
-        if os.path.exists(dir_name):
-            shutil.rmtree(dir_name)
-            print(f"Cleaned {dir_name} directory")
-
-def build_executable():
-    """Build the executable using PyInstaller"""
-    platform_name, extension = get_platform_info()
-    
-    # PyInstaller arguments
-    args = [
-        "pyinstaller",
-        "--onefile",  # Create a single executable file
-        "--windowed",  # Don't show console window (GUI app)
-        "--name=EWI-LongTone-Visualizer",
-        "--icon=icon.ico" if platform_name == "windows" else "--icon=icon.icns",
-        # Add data files
-        "--add-data=README.md:.",
-        "--add-data=requirements.txt:.",
-        # Hidden imports for matplotlib backends and dependencies
-        "--hidden-import=matplotlib.backends.backend_agg",
-        "--hidden-import=matplotlib.backends.backend_tkinter", 
-        "--hidden-import=PIL",
-        "--hidden-import=PIL.Image",
-        "--hidden-import=PIL._tkinter_finder",
-        "--hidden-import=pygame",
-        "--hidden-import=numpy",
-        # Exclude unnecessary modules to reduce size
-        "--exclude-module=tkinter",
-        "main.py"
-    ]
-    
-    # Remove icon argument if icon files don't exist
-    if not os.path.exists("icon.ico") and not os.path.exists("icon.icns"):
-        args = [arg for arg in args if not arg.startswith("--icon")]
-    
-    print(f"Building executable for {platform_name}...")
-    print(f"Command: {' '.join(args)}")
-    
-    try:
-        result = subprocess.run(args, check=True, capture_output=True, text=True)
-        print("Build successful!")
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Build failed: {e}")
-        print(f"Error output: {e.stderr}")
-        return False
+# PyInstaller spec file, regenerated when the PyInstaller options change
+SPEC_FILE = "EWI-LongTone-Visualizer.spec"
 
-def create_release_package():
-    """Create a release package with the executable and documentation"""
-    platform_name, extension = get_platform_info()
-    
-    # Create release directory
-    release_dir = f"release-{platform_name}"
-    if os.path.exists(release_dir):
-        shutil.rmtree(release_dir)
-    os.makedirs(release_dir)
-    
-    # Copy executable
-    executable_name = f"EWI-LongTone-Visualizer{extension}"
-    if platform_name == "macos":
-        # On macOS, PyInstaller creates a .app bundle
-        src_path = f"dist/{executable_name}"
-        if os.path.exists(src_path):
-            shutil.copytree(src_path, f"{release_dir}/{executable_name}")
-        else:
-            print(f"Warning: Could not find {src_path}")
-            return False
-    else:
-        # On Windows/Linux, it's a single file
-        src_path = f"dist/{executable_name}"
-        if os.path.exists(src_path):
-            shutil.copy2(src_path, release_dir)
-        else:
-            print(f"Warning: Could not find {src_path}")
-            return False
-    
-    # Copy documentation
-    docs_to_copy = ["README.md", "requirements.txt"]
-    for doc in docs_to_copy:
-        if os.path.exists(doc):
-            shutil.copy2(doc, release_dir)
-    
-    # Create installation instructions
-    create_install_instructions(release_dir, platform_name)
-    
-    print(f"Release package created in {release_dir}/")
-    return True
+# Application icon file for each platform; PyInstaller can't embed one on Linux
+ICON_FILES = {"windows": "icon.ico", "macos": "icon.icns"}
 
-def create_install_instructions(release_dir, platform_name):
-    """Create platform-specific installation instructions"""
-    if platform_name == "macos":
-        instructions = """# EWI Long Tone Visualizer - macOS Installation
+# Installation instructions written next to the executable, per platform
+INSTALL_INSTRUCTIONS = {
+    "macos": b"""# EWI Long Tone Visualizer - macOS Installation
 
 ## Quick Start
 1. Double-click "EWI-LongTone-Visualizer.app" to run
@@ -131,18 +38,21 @@ macOS may prevent the app from running because it's not from the App Store:
 
 ## Troubleshooting
 - If the app won't open, try running from Terminal: `./EWI-LongTone-Visualizer.app/Contents/MacOS/EWI-LongTone-Visualizer`
-- If you get "ModuleNotFoundError: No module named 'PIL'", rebuild with Pillow included
 - Make sure your MIDI device is connected and recognized by macOS
 - Check Audio MIDI Setup if you have MIDI connection issues
 - For Gatekeeper issues, right-click the app and select "Open" to bypass security warnings
-"""
+""",
     
-    elif platform_name == "windows":
-        instructions = """# EWI Long Tone Visualizer - Windows Installation
+    "windows": b"""# EWI Long Tone Visualizer - Windows Installation
 
 ## Quick Start
-1. Double-click "EWI-LongTone-Visualizer.exe" to run
-2. Connect your EWI/MIDI controller and start practicing!
+1. Unzip the EWI-LongTone-Visualizer zip file (right-click and select "Extract All")
+2. Open the extracted "EWI-LongTone-Visualizer" folder
+3. Double-click "EWI-LongTone-Visualizer.exe" to run
+4. Connect your EWI/MIDI controller and start practicing!
+
+Keep the "EWI-LongTone-Visualizer" folder together - the executable needs the
+files next to it.
 
 ## First Time Setup
 Windows may show a security warning for unsigned executables:
@@ -155,16 +65,19 @@ Windows may show a security warning for unsigned executables:
 - Make sure your MIDI device drivers are installed
 - Run as Administrator if you have permission issues
 - Check Windows Device Manager if MIDI isn't detected
-"""
+""",
     
-    else:  # Linux
-        instructions = """# EWI Long Tone Visualizer - Linux Installation
+    "linux": b"""# EWI Long Tone Visualizer - Linux Installation
 
 ## Quick Start
 1. Open terminal in this directory
-2. Make executable: `chmod +x EWI-LongTone-Visualizer`
-3. Run: `./EWI-LongTone-Visualizer`
-4. Connect your EWI/MIDI controller and start practicing!
+2. Unzip: `unzip EWI-LongTone-Visualizer.zip && cd EWI-LongTone-Visualizer`
+3. Make executable: `chmod +x EWI-LongTone-Visualizer`
+4. Run: `./EWI-LongTone-Visualizer`
+5. Connect your EWI/MIDI controller and start practicing!
+
+Keep the "EWI-LongTone-Visualizer" folder together - the executable needs the
+files next to it.
 
 ## Dependencies
 Make sure you have ALSA and MIDI support:
@@ -176,40 +89,506 @@ sudo apt-get install alsa-utils libasound2-dev
 - Add your user to the audio group: `sudo usermod -a -G audio $USER`
 - Check MIDI devices: `aconnect -l`
 - Install additional MIDI tools if needed: `sudo apt-get install qjackctl`
-"""
+""",
+}
+
+@functools.lru_cache(maxsize=1)
+def get_platform_info():
+    """Get platform-specific information"""
+    if sys.platform == "darwin":
+        return "macos", ".app"
+    elif sys.platform.startswith("win"):
+        return "windows", ".exe"
+    else:
+        return "linux", ""
+
+@functools.lru_cache(maxsize=1)
+def get_project_files():
+    """Snapshot the names in the project directory, taken once per build"""
+    with os.scandir(".") as entries:
+        return frozenset(entry.name for entry in entries)
+
+def get_workpath():
+    """Get PyInstaller's work directory, kept off the project filesystem"""
+    import stat
+    import tempfile
+    
+    workpath = os.environ.get("EWI_WORKPATH")
+    if workpath:
+        os.makedirs(workpath, exist_ok=True)
+        return workpath
+    
+    if sys.platform.startswith("linux") and os.path.isdir("/dev/shm"):
+        # RAM-backed on Linux, so intermediate files never touch the disk
+        base_dir = "/dev/shm"
+    else:
+        base_dir = tempfile.gettempdir()
+    if not hasattr(os, "getuid"):
+        # Windows temp directories are already per-user
+        workpath = os.path.join(base_dir, "ewi-build")
+        os.makedirs(workpath, exist_ok=True)
+        return workpath
+    
+    # The base directory is shared by all users, so use a private directory and
+    # refuse one that someone else created, since PyInstaller reuses its contents
+    workpath = os.path.join(base_dir, f"ewi-build-{os.getuid()}")
+    os.makedirs(workpath, mode=0o700, exist_ok=True)
+    info = os.lstat(workpath)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        print(f"Error: {workpath} is not a directory owned by you; remove it or set EWI_WORKPATH")
+        sys.exit(1)
+    os.chmod(workpath, 0o700)
+    return workpath
+
+# Background deletions started by clean_build_dirs(), joined before exit
+_cleanup_threads = []
+_queued_deletions = set()
+
+def delete_in_background(path):
+    """Delete a directory tree on a background thread, once per path"""
+    import shutil
     
-    with open(f"{release_dir}/INSTALL.md", "w") as f:
-        f.write(instructions)
+    if path in _queued_deletions:
+        return
+    _queued_deletions.add(path)
+    thread = threading.Thread(target=shutil.rmtree, args=(path,),
+                              kwargs={"ignore_errors": True})
+    thread.start()
+    _cleanup_threads.append(thread)
+
+def clean_build_dirs():
+    """Clean previous build directories"""
+    import tempfile
+    
+    present = get_project_files()
+    build_dirs = ("build", "dist", "__pycache__")
+    
+    # Remove trees left behind by earlier runs that were killed mid-delete
+    for name in present:
+        if ".trash-" in name and name.partition(".trash-")[0] in build_dirs:
+            delete_in_background(name)
+    
+    for dir_name in build_dirs:
+        if dir_name not in present:
+            continue
+        
+        with os.scandir(dir_name) as entries:
+            is_empty = next(entries, None) is None
+        if is_empty:
+            os.rmdir(dir_name)
+        else:
+            # Renaming is a single fast operation; the slow recursive delete of
+            # the renamed tree then overlaps with the PyInstaller build. mkdtemp
+            # picks a fresh name, so it can't clash with a leftover being swept.
+            trash = tempfile.mkdtemp(prefix=f"{dir_name}.trash-", dir=".")
+            os.replace(dir_name, os.path.join(trash, dir_name))
+            delete_in_background(trash)
+        print(f"Cleaned {dir_name} directory")
+
+def wait_for_cleanup():
+    """Wait for background deletions of old build directories to finish"""
+    for thread in _cleanup_threads:
+        thread.join()
+    _cleanup_threads.clear()
+
+def get_spec_options():
+    """Get the PyInstaller options used to generate the spec file"""
+    platform_name, extension = get_platform_info()
+    
+    # PyInstaller arguments
+    args = [
+        "--onedir",  # Create a folder - much faster to build and start than --onefile
+        "--windowed",  # Don't show console window (GUI app)
+        "--name=EWI-LongTone-Visualizer",
+        # Hidden imports for dependencies
+        "--hidden-import=pygame",
+        "--hidden-import=numpy",
+        # Exclude unnecessary modules to reduce size and shrink the module
+        # graph PyInstaller has to analyze
+        "--exclude-module=tkinter",
+        "--exclude-module=scipy",
+        "--exclude-module=pandas",
+        "--exclude-module=IPython",
+        "--exclude-module=pytest",
+        "--exclude-module=numpy.f2py",
+        "--exclude-module=numpy.testing",
+        "--exclude-module=matplotlib",
+        "--exclude-module=PIL",
+        "--exclude-module=unittest",
+        "--exclude-module=xmlrpc",
+        "--exclude-module=pydoc_data",
+        # Skip UPX compression - it slows both the pack step and app startup
+        "--noupx",
+        "main.py"
+    ]
+    
+    # Only pass an icon if this platform's icon file exists. PyInstaller resolves
+    # a relative icon path against the spec directory, so make it absolute.
+    icon = ICON_FILES.get(platform_name)
+    if icon in get_project_files():
+        args.append(f"--icon={os.path.abspath(icon)}")
+    
+    return args
+
+def get_spec_file(options, spec_dir="."):
+    """Generate the PyInstaller spec file, reusing it while the options are unchanged"""
+    import subprocess
+    
+    # The spec only depends on the options, not on the source files
+    spec_file = os.path.join(spec_dir, SPEC_FILE)
+    spec_fingerprint_file = f"{spec_file}.fingerprint"
+    fingerprint = repr(options)
+    try:
+        with open(spec_fingerprint_file) as f:
+            if f.read() == fingerprint and os.path.exists(spec_file):
+                return spec_file
+    except OSError:
+        pass
+    
+    print("Generating PyInstaller spec file...")
+    os.makedirs(spec_dir, exist_ok=True)
+    commands = get_pyinstaller_commands()
+    result = None
+    if commands is not None:
+        try:
+            result = subprocess.run(commands[1] + ["--specpath", spec_dir] + options,
+                                    capture_output=True, text=True, stdin=subprocess.DEVNULL)
+        except FileNotFoundError:
+            pass
+    if result is None:
+        print("Error: PyInstaller not found. Install it with:")
+        print("pip install pyinstaller")
+        return None
+    if result.returncode != 0:
+        print(f"Failed to generate spec file: {result.stdout}{result.stderr}")
+        return None
+    with open(spec_fingerprint_file, "w") as f:
+        f.write(fingerprint)
+    return spec_file
+
+def get_pyinstaller_config_dir():
+    """Get the directory for PyInstaller's cache, unless overridden by the user"""
+    return os.environ.get("PYINSTALLER_CONFIG_DIR", os.path.expanduser("~/.cache/pyinstaller-ewi"))
+
+def start_build(spec_file, dist_dir="dist", workpath=None):
+    """Start PyInstaller in the background and return its process"""
+    import subprocess
+    
+    # With a spec file PyInstaller skips regenerating the build configuration
+    args = get_pyinstaller_commands()[0] + ["--noconfirm", "--workpath", workpath or get_workpath(),
+            "--distpath", dist_dir, spec_file]
+    platform_name, extension = get_platform_info()
+    print(f"Building executable for {platform_name}...")
+    print(f"Command: {' '.join(args)}")
+    
+    # Keep PyInstaller's cache in a stable per-user location between builds
+    env = os.environ.copy()
+    env["PYINSTALLER_CONFIG_DIR"] = get_pyinstaller_config_dir()
+    
+    # PyInstaller's output is streamed by finish_build() instead of buffering
+    # the whole log in memory. stdin is closed so child tools never wait on a TTY.
+    return subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, bufsize=1, env=env)
+
+def finish_build(process, prefix=""):
+    """Stream a running PyInstaller build's output and wait for it to finish"""
+    for line in process.stdout:
+        sys.stdout.write(prefix + line)
+    returncode = process.wait()
+    
+    if returncode != 0:
+        print(f"{prefix}Build failed: PyInstaller exited with status {returncode}")
+        return False
+    
+    print(f"{prefix}Build successful!")
+    return True
+
+def build_target(target):
+    """Build and package one target architecture, run in its own worker process"""
+    # Each target gets its own PyInstaller cache so parallel builds don't
+    # collide; the directory is stable so later builds reuse it
+    os.environ["PYINSTALLER_CONFIG_DIR"] = os.path.join(get_pyinstaller_config_dir(), target)
+    platform_name, extension = get_platform_info()
+    prefix = f"[{target}] "
+    dist_dir = os.path.join("dist", target)
+    
+    options = get_spec_options() + [f"--target-arch={target}"]
+    spec_file = get_spec_file(options, os.path.join("specs", target))
+    if spec_file is None:
+        return False
+    process = start_build(spec_file, dist_dir, os.path.join(get_workpath(), target))
+    release_dir = prepare_release_dir(platform_name, f"release-{platform_name}-{target}")
+    if not finish_build(process, prefix):
+        return False
+    return copy_executable(release_dir, platform_name, extension, dist_dir)
+
+def build_targets(targets):
+    """Build several target architectures, in parallel when there is more than one"""
+    import multiprocessing
+    
+    if len(targets) == 1:
+        return build_target(targets[0])
+    
+    # Each PyInstaller run is single-threaded, so separate processes scale
+    # with the number of cores
+    with multiprocessing.get_context("spawn").Pool(len(targets)) as pool:
+        return all(pool.map(build_target, targets))
+
+def get_pyinstaller_version():
+    """Get the installed PyInstaller version, or an empty string if unknown"""
+    import importlib.metadata
+    import subprocess
+    
+    try:
+        return importlib.metadata.version("pyinstaller")
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    # PyInstaller installed outside this interpreter only reports it when run
+    commands = get_pyinstaller_commands()
+    if commands is None:
+        return ""
+    try:
+        result = subprocess.run(commands[0] + ["--version"], capture_output=True,
+                                text=True, stdin=subprocess.DEVNULL)
+    except OSError:
+        return ""
+    return result.stdout.strip()
+
+def source_fingerprint(options):
+    """Hash the build inputs: sources, requirements, icons, tool versions and options"""
+    platform_name, extension = get_platform_info()
+    inputs = ("requirements.txt", "build_requirements.txt", ICON_FILES.get(platform_name))
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(get_project_files()):
+        if name.endswith(".py") or name in inputs:
+            with open(name, "rb") as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+    digest.update(sys.version.encode())
+    digest.update(get_pyinstaller_version().encode())
+    digest.update(repr(options).encode())
+    return digest.hexdigest()
+
+def is_build_current(fingerprint):
+    """Check whether dist/ already holds a build made from the same inputs"""
+    platform_name, extension = get_platform_info()
+    app_name = f"EWI-LongTone-Visualizer{extension if platform_name == 'macos' else ''}"
+    if not os.path.exists(os.path.join("dist", app_name)):
+        return False
+    try:
+        with open(FINGERPRINT_FILE) as f:
+            return f.read() == fingerprint
+    except OSError:
+        return False
+
+def fast_copy(src, dst):
+    """Copy a file, preferring a hardlink or copy-on-write clone over a byte copy"""
+    import shutil
+    import subprocess
+    
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    try:
+        os.link(src, dst)
+        return dst
+    except OSError:
+        pass
+    try:
+        subprocess.run(["cp", "--reflink=auto", src, dst], check=True,
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        return dst
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return shutil.copy2(src, dst)
+
+def prepare_release_dir(platform_name, release_dir=None):
+    """Create the release directory with documentation and install instructions"""
+    release_dir = release_dir or f"release-{platform_name}"
+    present = get_project_files()
+    
+    # Reuse an existing release directory, only removing the files we replace
+    os.makedirs(release_dir, exist_ok=True)
+    with os.scandir(release_dir) as entries:
+        existing = {entry.name: entry for entry in entries}
+    docs_to_copy = sorted(present.intersection(["README.md", "requirements.txt"]))
+    for doc in docs_to_copy:
+        if doc in existing:
+            os.unlink(existing[doc].path)
+    
+    # Copy documentation and create installation instructions in parallel
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(fast_copy, doc, release_dir) for doc in docs_to_copy]
+        futures.append(executor.submit(create_install_instructions,
+                                       os.path.join(release_dir, "INSTALL.md"), platform_name))
+        for future in futures:
+            future.result()
+    
+    return release_dir
+
+def copy_executable(release_dir, platform_name, extension, dist_dir="dist"):
+    """Copy the built executable into the release directory"""
+    import shutil
+    import zipfile
+    
+    # On macOS, PyInstaller creates a .app bundle; on Windows/Linux it's a folder
+    app_name = f"EWI-LongTone-Visualizer{extension if platform_name == 'macos' else ''}"
+    src_path = os.path.join(dist_dir, app_name)
+    dst_path = os.path.join(release_dir, app_name)
+    if not os.path.exists(src_path):
+        print(f"Warning: Could not find {src_path}")
+        return False
+    
+    if platform_name == "macos":
+        # Replacing a bundle piece by piece is risky, so remove any old copy
+        if os.path.exists(dst_path):
+            shutil.rmtree(dst_path)
+        
+        # Hardlink every file in the bundle and keep its internal symlinks;
+        # fall back to a real copy if linking fails (e.g. across devices)
+        try:
+            shutil.copytree(src_path, dst_path, copy_function=os.link, symlinks=True)
+        except (OSError, shutil.Error):
+            shutil.rmtree(dst_path, ignore_errors=True)
+            shutil.copytree(src_path, dst_path, symlinks=True)
+    else:
+        # Ship the folder and the docs as a single zip file
+        archive = shutil.make_archive(dst_path, "zip", dist_dir, app_name)
+        with zipfile.ZipFile(archive, "a", zipfile.ZIP_DEFLATED) as zf:
+            for doc in ("INSTALL.md", "README.md", "requirements.txt"):
+                doc_path = os.path.join(release_dir, doc)
+                if os.path.exists(doc_path):
+                    zf.write(doc_path, doc)
+    return True
+
+def create_install_instructions(install_path, platform_name):
+    """Create platform-specific installation instructions"""
+    # Write the prebuilt bytes directly, skipping the text I/O layers
+    fd = os.open(install_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, INSTALL_INSTRUCTIONS[platform_name])
+    finally:
+        os.close(fd)
+
+@functools.lru_cache(maxsize=1)
+def get_pyinstaller_commands():
+    """Get the commands for pyinstaller and pyi-makespec, or None if PyInstaller is missing"""
+    import shutil
+    
+    # When this interpreter can import PyInstaller, run it as a module so the
+    # check doesn't depend on its scripts being on PATH
+    if importlib.util.find_spec("PyInstaller") is not None:
+        return ([sys.executable, "-m", "PyInstaller"],
+                [sys.executable, "-m", "PyInstaller.utils.cliutils.makespec"])
+    
+    # PyInstaller may live outside this interpreter (e.g. installed with pipx)
+    pyinstaller = shutil.which("pyinstaller")
+    makespec = shutil.which("pyi-makespec")
+    if pyinstaller and makespec:
+        return [pyinstaller], [makespec]
+    return None
+
+def pyinstaller_available():
+    """Check for PyInstaller without spawning a process"""
+    return get_pyinstaller_commands() is not None
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Build EWI Long Tone Visualizer executables")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild even if nothing changed since the last build")
+    parser.add_argument("--targets", type=lambda value: [t for t in value.split(",") if t],
+                        default=[], metavar="ARCH[,ARCH...]",
+                        help="macOS only: build these architectures (x86_64, arm64, "
+                             "universal2) in parallel")
+    return parser.parse_args()
+
+def build_all_targets(targets):
+    """Build and package each requested target architecture"""
+    platform_name, _ = get_platform_info()
+    if platform_name != "macos":
+        # PyInstaller can't cross-compile; only macOS builds for other architectures
+        print("Error: --targets is only supported on macOS")
+        sys.exit(1)
+    
+    clean_build_dirs()
+    try:
+        build_ok = build_targets(targets)
+    finally:
+        wait_for_cleanup()
+    
+    if not build_ok:
+        print("[ERROR] Failed to build all targets")
+        sys.exit(1)
+    print(f"\n[SUCCESS] Build complete!")
+    for target in targets:
+        print(f"[PACKAGE] Release package: release-{platform_name}-{target}/")
+    print(f"[READY] Ready for GitHub release!")
 
 def main():
     """Main build process"""
+    options = parse_args()
+    
     print("EWI Long Tone Visualizer - Executable Builder")
     print("=" * 50)
     
     # Check if PyInstaller is available
-    try:
-        subprocess.run(["pyinstaller", "--version"], check=True, capture_output=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not pyinstaller_available():
         print("Error: PyInstaller not found. Install it with:")
         print("pip install pyinstaller")
         sys.exit(1)
     
-    # Clean previous builds
-    clean_build_dirs()
+    # Snapshot the project directory once so later steps skip repeated stat calls
+    get_project_files()
     
-    # Build executable
-    if not build_executable():
-        sys.exit(1)
+    if options.targets:
+        build_all_targets(options.targets)
+        return
     
-    # Create release package
-    if create_release_package():
-        platform_name, _ = get_platform_info()
-        print(f"\n[SUCCESS] Build complete!")
-        print(f"[PACKAGE] Release package: release-{platform_name}/")
-        print(f"[READY] Ready for GitHub release!")
-    else:
-        print("[ERROR] Failed to create release package")
-        sys.exit(1)
+    # Skip PyInstaller entirely when dist/ was built from the same inputs
+    spec_options = get_spec_options()
+    fingerprint = source_fingerprint(spec_options)
+    rebuild = options.force or not is_build_current(fingerprint)
+    
+    # Clean previous builds
+    if rebuild:
+        clean_build_dirs()
+    
+    try:
+        platform_name, extension = get_platform_info()
+        
+        if rebuild:
+            # Build executable. The release directory only needs repo files, so
+            # prepare it in the background while PyInstaller runs.
+            spec_file = get_spec_file(spec_options)
+            if spec_file is None:
+                sys.exit(1)
+            process = start_build(spec_file)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                release_future = executor.submit(prepare_release_dir, platform_name)
+                build_ok = finish_build(process)
+                release_dir = release_future.result()
+            if not build_ok:
+                sys.exit(1)
+            with open(FINGERPRINT_FILE, "w") as f:
+                f.write(fingerprint)
+        else:
+            print("Sources unchanged since the last build, skipping PyInstaller "
+                  "(use --force to rebuild)")
+            release_dir = prepare_release_dir(platform_name)
+        
+        # Add the executable to the release package
+        if copy_executable(release_dir, platform_name, extension):
+            print(f"Release package created in {release_dir}/")
+            print(f"\n[SUCCESS] Build complete!")
+            print(f"[PACKAGE] Release package: {release_dir}/")
+            print(f"[READY] Ready for GitHub release!")
+        else:
+            print("[ERROR] Failed to create release package")
+            sys.exit(1)
+    finally:
+        # Let the background deletion of old build trees finish before exiting
+        wait_for_cleanup()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
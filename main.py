@@ -1,12 +1,27 @@
+import os
 import sys
 import time
+import tempfile
+import bisect
+import threading
+from collections import deque
 import numpy as np
 import pygame
 import pygame.midi
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Numba caches the compiled kernels in __pycache__ next to this file, or else in
+# the user's cache directory. If neither is writable, caching has nowhere to go
+# and the kernels would fail to load, so fall back to the temp directory
+if not (os.access(os.path.dirname(os.path.abspath(__file__)), os.W_OK)
+        or os.access(os.path.expanduser("~"), os.W_OK)):
+    os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "numba-cache"))
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Numba is optional; without it the kernels fall back to vectorized numpy
+    NUMBA_AVAILABLE = False
 
 # Constants
 WINDOW_WIDTH = 1200
@@ -14,11 +29,45 @@ WINDOW_HEIGHT = 700
 HISTORY_LENGTH = 300  # Number of velocity readings to keep
 UPDATE_RATE = 30  # FPS
 MIDI_POLL_RATE = 10  # ms
+MAX_PENDING_MIDI_EVENTS = 4096  # Oldest unprocessed events are dropped beyond this
 BG_COLOR = (25, 25, 25)
 TEXT_COLOR = (230, 230, 230)
 GRAPH_COLOR = (65, 156, 255)
 DEBUG_COLOR = (255, 255, 100)
+ERROR_COLOR = (255, 100, 100)
+GRAPH_SIZE = (800, 300)  # Size of the graph surface, including axis labels
+GRAPH_PLOT_RECT = (100, 36, 620, 231)  # Plot area within the graph surface
+GRAPH_FACE_COLOR = (26, 26, 26, 204)
+GRAPH_GRID_COLOR = (71, 71, 71, 204)
+GRAPH_MAX_VELOCITY = 130  # Top of the velocity axis
 MAX_DEBUG_MESSAGES = 20
+TEXT_CACHE_SIZE = 256  # Number of rendered text surfaces to keep
+# Fill gaps of this many samples or less to connect musical phrases. This covers
+# about 600ms at 30 FPS, which should cover most note transitions
+GAP_THRESHOLD = 20
+
+# Names of all 128 MIDI notes, e.g. 60 -> "C4"
+NOTE_NAMES = tuple(
+    f"{['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'][i % 12]}{i // 12 - 1}"
+    for i in range(128)
+)
+
+# Names of common CCs for debug messages and the CC selection button
+CC_NAMES_SHORT = {
+    1: "Modulation",
+    2: "Breath",
+    7: "Volume",
+    11: "Expression",
+    64: "Sustain",
+    74: "Filter Cutoff"
+}
+CC_NAMES_LONG = {
+    1: "Modulation (CC1)",
+    2: "Breath (CC2)",
+    7: "Volume (CC7)",
+    11: "Expression (CC11)",
+    74: "Filter (CC74)"
+}
 
 # Color palette for different notes
 NOTE_COLORS = [
@@ -36,6 +85,115 @@ NOTE_COLORS = [
     (255, 150, 200),  # Pink
 ]
 
+if NUMBA_AVAILABLE:
+    @njit("Tuple((float32[:], int16[:]))(float32[:], int16[:], int64)", cache=True)
+    def fill_gaps(velocity_history, note_history, gap_threshold):
+        """Interpolate across brief gaps between readings to connect musical phrases"""
+        n = velocity_history.shape[0]
+        velocity_smoothed = velocity_history.copy()
+        note_history_smoothed = note_history.copy()
+        
+        # Walk consecutive non-zero readings and interpolate across small gaps
+        start_idx = -1
+        for end_idx in range(n):
+            if velocity_history[end_idx] <= 0:
+                continue
+            gap_size = end_idx - start_idx - 1
+            
+            # If gap is small enough, interpolate across it
+            if start_idx >= 0 and 0 < gap_size <= gap_threshold:
+                start_vel = velocity_history[start_idx]
+                end_vel = velocity_history[end_idx]
+                start_note = note_history[start_idx]
+                end_note = note_history[end_idx]
+                
+                # Use a minimum velocity during transitions to avoid drops to 0
+                min_transition_velocity = min(start_vel, end_vel) * 0.7
+                
+                for j in range(1, gap_size + 1):
+                    # Linear interpolation with minimum floor
+                    alpha = j / (gap_size + 1)
+                    interp_vel = start_vel * (1 - alpha) + end_vel * alpha
+                    velocity_smoothed[start_idx + j] = max(interp_vel, min_transition_velocity)
+                    
+                    # Use the end note for the interpolated section if it's valid
+                    if end_note >= 0:
+                        note_history_smoothed[start_idx + j] = end_note
+                    elif start_note >= 0:
+                        note_history_smoothed[start_idx + j] = start_note
+            start_idx = end_idx
+        
+        return velocity_smoothed, note_history_smoothed
+else:
+    def fill_gaps(velocity_history, note_history, gap_threshold):
+        """Interpolate across brief gaps between readings to connect musical phrases"""
+        velocity_smoothed = velocity_history.copy()
+        note_history_smoothed = note_history.copy()
+        
+        # Gaps start where readings go from non-zero to zero and end where they
+        # go back; leading and trailing zeros have no reading on one side
+        active = (velocity_history > 0).view(np.int8)
+        transitions = np.diff(active)
+        gap_starts = np.flatnonzero(transitions == -1) + 1
+        gap_ends = np.flatnonzero(transitions == 1) + 1
+        if gap_ends.size and gap_starts.size and gap_ends[0] < gap_starts[0]:
+            gap_ends = gap_ends[1:]
+        gap_starts = gap_starts[:gap_ends.size]
+        
+        # Only bridge gaps that are small enough
+        small = gap_ends - gap_starts <= gap_threshold
+        if not small.any():
+            return velocity_smoothed, note_history_smoothed
+        
+        starts = gap_starts[small] - 1  # Last reading before each gap
+        ends = gap_ends[small]  # First reading after each gap
+        sizes = ends - starts - 1
+        
+        # Every index inside a small gap, built without a Python loop
+        offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        interp_x = np.repeat(starts, sizes) + offsets + 1
+        
+        # Linear interpolation with a minimum floor so transitions don't drop to 0
+        known_x = np.column_stack((starts, ends)).ravel()
+        interp_vel = np.interp(interp_x, known_x, velocity_history[known_x])
+        min_transition_velocity = np.minimum(velocity_history[starts], velocity_history[ends]) * 0.7
+        velocity_smoothed[interp_x] = np.maximum(interp_vel, np.repeat(min_transition_velocity, sizes))
+        
+        # Use the end note for the interpolated section if it's valid, else the start note
+        start_notes = note_history[starts]
+        end_notes = note_history[ends]
+        fill_notes = np.repeat(np.where(end_notes >= 0, end_notes, start_notes), sizes)
+        has_note = fill_notes >= 0
+        note_history_smoothed[interp_x[has_note]] = fill_notes[has_note]
+        
+        return velocity_smoothed, note_history_smoothed
+
+if NUMBA_AVAILABLE:
+    @njit("UniTuple(float64, 4)(float32[:])", cache=True)
+    def note_stats(velocities):
+        """Return the mean, standard deviation, min and max of velocities in one pass"""
+        # Welford's algorithm keeps the running variance numerically stable
+        mean = 0.0
+        m2 = 0.0
+        vmin = velocities[0]
+        vmax = velocities[0]
+        for i in range(velocities.shape[0]):
+            value = velocities[i]
+            delta = value - mean
+            mean += delta / (i + 1)
+            m2 += delta * (value - mean)
+            vmin = min(vmin, value)
+            vmax = max(vmax, value)
+        return mean, np.sqrt(m2 / velocities.shape[0]), vmin, vmax
+else:
+    def note_stats(velocities):
+        """Return the mean, standard deviation, min and max of velocities"""
+        # Sum and sum of squares avoid the extra passes of np.mean and np.std
+        n = velocities.size
+        mean = velocities.sum(dtype=np.float64) / n
+        variance = max((velocities * velocities).sum(dtype=np.float64) / n - mean * mean, 0.0)
+        return mean, np.sqrt(variance), velocities.min(), velocities.max()
+
 class LongToneVisualizer:
     def __init__(self):
         # Initialize pygame
@@ -49,19 +207,30 @@ class LongToneVisualizer:
         self.small_font = pygame.font.SysFont("Arial", 16)
         self.large_font = pygame.font.SysFont("Arial", 48)
         self.clock = pygame.time.Clock()
+        self.text_cache = {}  # Rendered text surfaces keyed by (font, text, color)
         
         # Set up MIDI input
         self.setup_midi()
+        self.midi_events = deque(maxlen=MAX_PENDING_MIDI_EVENTS)  # Events read by the polling thread, oldest first
+        self.midi_running = False
+        self.midi_error = None  # Set by the polling thread if reading MIDI input fails
+        self.midi_thread = threading.Thread(target=self.poll_midi, daemon=True)
         
         # Data storage
         self.current_note = None
         self.current_velocity = 0
         self.note_name = "No note"
-        self.velocity_history = np.zeros(HISTORY_LENGTH)
-        self.note_history = np.full(HISTORY_LENGTH, -1)  # Track which note at each point (-1 = no note)
+        # Velocities and notes both fit in 0-127, so small dtypes keep the arrays compact
+        self.velocity_history = np.zeros(HISTORY_LENGTH, dtype=np.float32)
+        self.note_history = np.full(HISTORY_LENGTH, -1, dtype=np.int16)  # Track which note at each point (-1 = no note)
+        self.hist_idx = 0  # Ring buffer write position; also where the oldest reading is
         self.note_colors = {}  # Map note numbers to colors
         self.color_index = 0  # For cycling through colors
+        self.note_counts = [0] * 128  # How many history samples hold each note
+        self.seen_notes = []  # Sorted notes currently in the history, for the legend
         self.is_note_active = False
+        self.graph_dirty = True  # Set whenever the data shown in the graph changes
+        self.graph_surf = None  # Graph from the last redraw
         self.time_held = 0
         self.start_time = 0
         self.current_note_start_idx = 0  # Where current note started in history
@@ -75,17 +244,22 @@ class LongToneVisualizer:
         # Debug mode
         self.debug_mode = False
         self.debug_messages = []
+        self.debug_message_surfs = {}  # Rendered debug messages, dropped as they rotate out
         self.cc_values = {}  # Store current CC values
+        self.cc_numbers = []  # CC numbers seen so far, kept sorted for the debug panel
         self.selected_cc = 7  # Default to CC7 (Volume) for breath controller
         
         # CC Controller button
         self.cc_button_rect = pygame.Rect(50, WINDOW_HEIGHT - 100, 200, 40)
         self.cc_dropdown_open = False
         
-        # Create matplotlib figure for the graph
-        self.fig, self.ax = plt.subplots(figsize=(8, 3), dpi=100)
-        self.fig.patch.set_alpha(0.0)
-        self.ax.set_facecolor((0.1, 0.1, 0.1, 0.8))
+        # Screen areas drawn this frame and last frame, as (rect, key) pairs
+        self.drawn_rects = []
+        self.prev_drawn_rects = None  # None redraws the whole screen
+        
+        # Render the static parts of the graph (axes, grid, labels) once
+        self.graph_bg_surf, self.graph_plot_rect = self.render_graph_background()
+        self.ma_kernel = np.full(3, 1.0 / 3.0, dtype=np.float32)  # 3-point moving average
         
     def setup_midi(self):
         # List available MIDI devices
@@ -116,90 +290,111 @@ class LongToneVisualizer:
         self.midi_input = pygame.midi.Input(input_device_ids[0])
         print(f"Using MIDI device: {pygame.midi.get_device_info(input_device_ids[0])[1].decode()}")
         
+    def poll_midi(self):
+        """Read MIDI input on a background thread so events aren't tied to the frame rate"""
+        while self.midi_running:
+            try:
+                if self.midi_input.poll():
+                    # Drain everything that has arrived so fast breath CC streams
+                    # don't build up a backlog
+                    self.midi_events.extend(self.midi_input.read(1024))
+                else:
+                    time.sleep(0.001)
+            except Exception as e:
+                # Stop polling and let the main loop report the error
+                print(f"MIDI input error: {e}")
+                self.midi_error = e
+                return
+    
     def get_note_name(self, note_num):
-        notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        note_name = notes[note_num % 12]
-        octave = note_num // 12 - 1
-        return f"{note_name}{octave}"
+        return NOTE_NAMES[note_num]
     
     def add_debug_message(self, message):
         """Add a message to the debug log"""
         timestamp = time.strftime("%H:%M:%S")
         self.debug_messages.append(f"[{timestamp}] {message}")
         if len(self.debug_messages) > MAX_DEBUG_MESSAGES:
-            self.debug_messages.pop(0)
+            self.debug_message_surfs.pop(self.debug_messages.pop(0), None)
     
     def process_midi(self):
-        if self.midi_input.poll():
-            events = self.midi_input.read(10)
-            for event in events:
-                data = event[0]
-                status = data[0] & 0xF0
-                channel = data[0] & 0x0F
+        now = time.monotonic()  # One timestamp for every event in this batch
+        # Handle only the events already queued so a busy input can't stall the frame
+        for _ in range(len(self.midi_events)):
+            event = self.midi_events.popleft()
+            data = event[0]
+            status = data[0] & 0xF0
+            channel = data[0] & 0x0F
+            
+            # Note on event
+            if status == 0x90 and data[2] > 0:
+                self.current_note = data[1]
+                self.current_velocity = data[2]
+                self.note_name = self.get_note_name(self.current_note)
+                self.is_note_active = True
+                self.graph_dirty = True
+                self.start_time = now
                 
-                # Note on event
-                if status == 0x90 and data[2] > 0:
-                    self.current_note = data[1]
-                    self.current_velocity = data[2]
-                    self.note_name = self.get_note_name(self.current_note)
-                    self.is_note_active = True
-                    self.start_time = time.time()
-                    
-                    # Assign color to new note if not already assigned
-                    if self.current_note not in self.note_colors:
-                        self.note_colors[self.current_note] = NOTE_COLORS[self.color_index % len(NOTE_COLORS)]
-                        self.color_index += 1
-                    
-                    # Find current position in history for this note
-                    current_idx = np.sum(self.velocity_history > 0)
-                    self.current_note_start_idx = current_idx
-                    
-                    if self.debug_mode:
-                        self.add_debug_message(f"Note ON: {self.note_name} (#{data[1]}) Vel:{data[2]} Ch:{channel}")
-                    
-                # Note off event
-                elif (status == 0x80) or (status == 0x90 and data[2] == 0):
-                    if self.current_note == data[1]:
-                        self.is_note_active = False
-                    
-                    if self.debug_mode:
-                        note_name = self.get_note_name(data[1])
-                        self.add_debug_message(f"Note OFF: {note_name} (#{data[1]}) Ch:{channel}")
+                # Assign color to new note if not already assigned
+                if self.current_note not in self.note_colors:
+                    self.note_colors[self.current_note] = NOTE_COLORS[self.color_index % len(NOTE_COLORS)]
+                    self.color_index += 1
                 
-                # Continuous controller (for breath controllers)
-                elif status == 0xB0:
-                    cc_num = data[1]
-                    cc_value = data[2]
-                    self.cc_values[cc_num] = cc_value
-                    
-                    if self.debug_mode:
-                        cc_names = {
-                            1: "Modulation",
-                            2: "Breath",
-                            7: "Volume",
-                            11: "Expression",
-                            64: "Sustain",
-                            74: "Filter Cutoff"
-                        }
-                        cc_name = cc_names.get(cc_num, f"CC{cc_num}")
-                        self.add_debug_message(f"CC: {cc_name} ({cc_num}) = {cc_value} Ch:{channel}")
-                    
-                    # Use the selected CC for velocity
-                    if cc_num == self.selected_cc:
-                        self.current_velocity = cc_value
+                # Find current position in history for this note
+                current_idx = np.count_nonzero(self.velocity_history)
+                self.current_note_start_idx = current_idx
                 
-                # Other MIDI messages
-                else:
-                    if self.debug_mode:
-                        self.add_debug_message(f"MIDI: Status:{status:02X} Data:{data[1]},{data[2]} Ch:{channel}")
+                if self.debug_mode:
+                    self.add_debug_message(f"Note ON: {self.note_name} (#{data[1]}) Vel:{data[2]} Ch:{channel}")
+                
+            # Note off event
+            elif (status == 0x80) or (status == 0x90 and data[2] == 0):
+                if self.current_note == data[1]:
+                    self.is_note_active = False
+                    self.graph_dirty = True
+                
+                if self.debug_mode:
+                    note_name = self.get_note_name(data[1])
+                    self.add_debug_message(f"Note OFF: {note_name} (#{data[1]}) Ch:{channel}")
+            
+            # Continuous controller (for breath controllers)
+            elif status == 0xB0:
+                cc_num = data[1]
+                cc_value = data[2]
+                if cc_num not in self.cc_values:
+                    bisect.insort(self.cc_numbers, cc_num)
+                self.cc_values[cc_num] = cc_value
+                
+                if self.debug_mode:
+                    cc_name = CC_NAMES_SHORT.get(cc_num, f"CC{cc_num}")
+                    self.add_debug_message(f"CC: {cc_name} ({cc_num}) = {cc_value} Ch:{channel}")
+                
+                # Use the selected CC for velocity
+                if cc_num == self.selected_cc:
+                    self.current_velocity = cc_value
+            
+            # Other MIDI messages
+            else:
+                if self.debug_mode:
+                    self.add_debug_message(f"MIDI: Status:{status:02X} Data:{data[1]},{data[2]} Ch:{channel}")
         
         # Update velocity history
         if self.is_note_active:
-            self.velocity_history = np.roll(self.velocity_history, -1)
-            self.note_history = np.roll(self.note_history, -1)
-            self.velocity_history[-1] = self.current_velocity
-            self.note_history[-1] = self.current_note
-            self.time_held = time.time() - self.start_time
+            # Keep the legend's note counts in step with the sample being replaced
+            old_note = int(self.note_history[self.hist_idx])
+            if old_note != self.current_note:
+                if old_note >= 0:
+                    self.note_counts[old_note] -= 1
+                    if self.note_counts[old_note] == 0:
+                        self.seen_notes.remove(old_note)
+                if self.note_counts[self.current_note] == 0:
+                    bisect.insort(self.seen_notes, self.current_note)
+                self.note_counts[self.current_note] += 1
+            
+            self.velocity_history[self.hist_idx] = self.current_velocity
+            self.note_history[self.hist_idx] = self.current_note
+            self.hist_idx = (self.hist_idx + 1) % HISTORY_LENGTH
+            self.graph_dirty = True
+            self.time_held = now - self.start_time
             
             # Calculate statistics for current note only
             current_note_mask = self.note_history == self.current_note
@@ -207,104 +402,116 @@ class LongToneVisualizer:
             current_note_velocities = current_note_velocities[current_note_velocities > 0]
             
             if len(current_note_velocities) > 0:
-                self.stats["mean"] = np.mean(current_note_velocities)
-                self.stats["std_dev"] = np.std(current_note_velocities)
-                self.stats["min"] = np.min(current_note_velocities)
-                self.stats["max"] = np.max(current_note_velocities)
-        
+                (self.stats["mean"], self.stats["std_dev"],
+                 self.stats["min"], self.stats["max"]) = note_stats(current_note_velocities)
+        
+    def render_graph_background(self):
+        """Render the empty graph (axes, grid and labels) and return it with the plot area rect"""
+        surf = pygame.Surface(GRAPH_SIZE, pygame.SRCALPHA)
+        plot_rect = pygame.Rect(GRAPH_PLOT_RECT)
+        surf.fill(GRAPH_FACE_COLOR, plot_rect)
+        
+        # Vertical grid lines and time labels every 50 readings
+        x_scale = plot_rect.width / HISTORY_LENGTH
+        for tick in range(0, HISTORY_LENGTH + 1, 50):
+            x = round(plot_rect.left + tick * x_scale)
+            pygame.draw.line(surf, GRAPH_GRID_COLOR, (x, plot_rect.top), (x, plot_rect.bottom - 1))
+            label = self.render_text(self.small_font, str(tick), TEXT_COLOR)
+            surf.blit(label, label.get_rect(midtop=(x, plot_rect.bottom + 4)))
+        
+        # Horizontal grid lines and velocity labels every 20
+        y_scale = plot_rect.height / GRAPH_MAX_VELOCITY
+        for tick in range(0, GRAPH_MAX_VELOCITY, 20):
+            y = round(plot_rect.bottom - tick * y_scale)
+            pygame.draw.line(surf, GRAPH_GRID_COLOR, (plot_rect.left, y), (plot_rect.right - 1, y))
+            label = self.render_text(self.small_font, str(tick), TEXT_COLOR)
+            surf.blit(label, label.get_rect(midright=(plot_rect.left - 6, y)))
+        
+        pygame.draw.rect(surf, TEXT_COLOR, plot_rect, 1)
+        
+        # Title and axis labels
+        title = self.render_text(self.small_font, "Velocity Consistency Across Notes", TEXT_COLOR)
+        surf.blit(title, title.get_rect(midbottom=(plot_rect.centerx, plot_rect.top - 6)))
+        x_label = self.render_text(self.small_font, "Time", TEXT_COLOR)
+        surf.blit(x_label, x_label.get_rect(midtop=(plot_rect.centerx, plot_rect.bottom + 22)))
+        y_label = pygame.transform.rotate(self.render_text(self.small_font, "Velocity", TEXT_COLOR), 90)
+        surf.blit(y_label, y_label.get_rect(midright=(plot_rect.left - 36, plot_rect.centery)))
+        
+        return surf, plot_rect
+    
+    def ordered_history(self):
+        """Return the velocity and note histories ordered from oldest to newest"""
+        idx = self.hist_idx
+        return (np.concatenate((self.velocity_history[idx:], self.velocity_history[:idx])),
+                np.concatenate((self.note_history[idx:], self.note_history[:idx])))
+    
     def update_graph(self):
-        self.ax.clear()
-        
-        # Set up the plot
-        self.ax.set_xlim(0, HISTORY_LENGTH)
-        self.ax.set_ylim(0, 130)
-        self.ax.set_xlabel("Time")
-        self.ax.set_ylabel("Velocity")
-        self.ax.set_title("Velocity Consistency Across Notes")
-        self.ax.grid(True, alpha=0.3)
-        
-        # Plot velocity history as one continuous line with color changes
-        # First, identify segments and fill brief gaps for musical continuity
-        velocity_smoothed = self.velocity_history.copy()
-        note_history_smoothed = self.note_history.copy()
-        
-        # Fill brief gaps (20 samples or less) to connect musical phrases
-        # This covers about 600ms at 30 FPS, which should cover most note transitions
-        gap_threshold = 20
-        non_zero_indices = np.where(self.velocity_history > 0)[0]
-        
-        if len(non_zero_indices) > 1:
-            for i in range(len(non_zero_indices) - 1):
-                start_idx = non_zero_indices[i]
-                end_idx = non_zero_indices[i + 1]
-                gap_size = end_idx - start_idx - 1
-                
-                # If gap is small enough, interpolate across it
-                if gap_size <= gap_threshold and gap_size > 0:
-                    start_vel = self.velocity_history[start_idx]
-                    end_vel = self.velocity_history[end_idx]
-                    start_note = self.note_history[start_idx]
-                    end_note = self.note_history[end_idx]
-                    
-                    # Use a minimum velocity during transitions to avoid drops to 0
-                    min_transition_velocity = min(start_vel, end_vel) * 0.7
-                    
-                    # Interpolate velocity values
-                    for j in range(1, gap_size + 1):
-                        interp_idx = start_idx + j
-                        # Linear interpolation with minimum floor
-                        alpha = j / (gap_size + 1)
-                        interp_vel = start_vel * (1 - alpha) + end_vel * alpha
-                        velocity_smoothed[interp_idx] = max(interp_vel, min_transition_velocity)
-                        
-                        # Use the end note for the interpolated section if it's valid
-                        if end_note >= 0:
-                            note_history_smoothed[interp_idx] = end_note
-                        elif start_note >= 0:
-                            note_history_smoothed[interp_idx] = start_note
-        
-        # Apply additional smoothing to reduce noise
-        # Use a simple moving average over 3 points
-        velocity_final = velocity_smoothed.copy()
-        for i in range(1, len(velocity_final) - 1):
-            if velocity_smoothed[i] > 0:
-                velocity_final[i] = (velocity_smoothed[i-1] + velocity_smoothed[i] + velocity_smoothed[i+1]) / 3
-        
-        # Now plot the smoothed data
-        smoothed_non_zero_indices = np.where(velocity_final > 0)[0]
+        velocity_history, note_history = self.ordered_history()
+        
+        # Fill brief gaps for musical continuity
+        velocity_smoothed, note_history_smoothed = fill_gaps(
+            velocity_history, note_history, GAP_THRESHOLD)
+        
+        # Apply additional smoothing to reduce noise with a 3-point moving
+        # average, leaving the end points and empty readings untouched
+        # Smoothing never turns a reading on or off, so the same mask of
+        # non-zero readings serves for masking and for drawing below
+        active = velocity_smoothed > 0
+        velocity_final = np.convolve(velocity_smoothed, self.ma_kernel, mode="same")
+        velocity_final[~active] = 0
+        velocity_final[[0, -1]] = velocity_smoothed[[0, -1]]
+        
+        # Draw the data on a copy of the pre-rendered background
+        surf = self.graph_bg_surf.copy()
+        plot_rect = self.graph_plot_rect
+        surf.set_clip(plot_rect)
+        
+        # Convert data coordinates to pixel positions on the graph surface
+        x_scale = plot_rect.width / HISTORY_LENGTH
+        y_scale = plot_rect.height / GRAPH_MAX_VELOCITY
+        x_pixels = plot_rect.left + np.arange(HISTORY_LENGTH) * x_scale
+        y_pixels = plot_rect.bottom - velocity_final * y_scale
+        
+        smoothed_non_zero_indices = np.flatnonzero(active)
         
         if len(smoothed_non_zero_indices) > 1:
-            # Plot line segments between consecutive points with appropriate colors
-            for i in range(len(smoothed_non_zero_indices) - 1):
-                start_idx = smoothed_non_zero_indices[i]
-                end_idx = smoothed_non_zero_indices[i + 1]
-                
-                start_note = note_history_smoothed[start_idx]
-                end_note = note_history_smoothed[end_idx]
-                
-                # Use the color of the starting note for this segment
-                if start_note >= 0:
-                    color = self.note_colors.get(start_note, NOTE_COLORS[0])
-                    normalized_color = tuple(c/255 for c in color)
-                    
-                    # Plot line segment
-                    x_vals = [start_idx, end_idx]
-                    y_vals = [velocity_final[start_idx], velocity_final[end_idx]]
-                    self.ax.plot(x_vals, y_vals, color=normalized_color, linewidth=2, alpha=0.8)
-        
-        # Plot the mean line for current note only
+            # Each segment uses the color of its starting note; find where that
+            # changes and draw one polyline per run of same-colored segments
+            segment_notes = note_history_smoothed[smoothed_non_zero_indices[:-1]]
+            boundaries = np.flatnonzero(np.diff(segment_notes)) + 1
+            run_starts = np.concatenate(([0], boundaries))
+            run_ends = np.concatenate((boundaries, [len(segment_notes)]))
+            points = np.column_stack((x_pixels[smoothed_non_zero_indices],
+                                      y_pixels[smoothed_non_zero_indices])).tolist()
+            
+            # Gather each run's note as a plain int once, so the color lookups
+            # below don't hash numpy scalars
+            run_notes = segment_notes[run_starts].tolist()
+            for run_note, run_start, run_end in zip(run_notes, run_starts.tolist(), run_ends.tolist()):
+                if run_note >= 0:
+                    color = self.note_colors.get(run_note, NOTE_COLORS[0])
+                    pygame.draw.aalines(surf, color, False, points[run_start:run_end + 1])
+        
+        # Draw the mean line for current note only, dashed
         if self.is_note_active and self.stats["mean"] > 0:
-            self.ax.axhline(y=self.stats["mean"], color='r', linestyle='--', alpha=0.7)
-        
-        # Render the plot to a pygame surface
-        canvas = FigureCanvasAgg(self.fig)
-        canvas.draw()
-        
-        # Convert to pygame surface using the correct modern API
-        buf = canvas.buffer_rgba()
-        size = canvas.get_width_height()
-        surf = pygame.image.frombuffer(buf, size, "RGBA")
+            mean_y = plot_rect.bottom - self.stats["mean"] * y_scale
+            for dash_x in range(plot_rect.left, plot_rect.right, 10):
+                pygame.draw.line(surf, (255, 0, 0), (dash_x, mean_y),
+                                 (min(dash_x + 6, plot_rect.right), mean_y))
         
+        surf.set_clip(None)
+        return surf
+    
+    def render_text(self, font, text, color):
+        """Render text, reusing the surface from an earlier frame when possible"""
+        key = (id(font), text, color)
+        surf = self.text_cache.get(key)
+        if surf is None:
+            surf = font.render(text, True, color)
+            self.text_cache[key] = surf
+            # Evict the oldest entry once the cache is full
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.pop(next(iter(self.text_cache)))
         return surf
     
     def render_debug_panel(self):
@@ -313,45 +520,50 @@ class LongToneVisualizer:
         debug_y = 50
         
         # Debug mode indicator
-        debug_title = self.font.render("DEBUG MODE (Press 'D' to toggle)", True, DEBUG_COLOR)
-        self.screen.blit(debug_title, (debug_x, debug_y))
+        debug_title = self.render_text(self.font, "DEBUG MODE (Press 'D' to toggle)", DEBUG_COLOR)
+        self.blit(debug_title, (debug_x, debug_y))
         
         # Current CC selection
-        cc_text = self.font.render(f"Velocity Source: CC{self.selected_cc} (Use 1-9 keys)", True, TEXT_COLOR)
-        self.screen.blit(cc_text, (debug_x, debug_y + 30))
+        cc_text = self.render_text(self.font, f"Velocity Source: CC{self.selected_cc} (Use 1-9 keys)", TEXT_COLOR)
+        self.blit(cc_text, (debug_x, debug_y + 30))
         
         # Current CC values
         y_offset = debug_y + 70
-        cc_title = self.font.render("Current CC Values:", True, TEXT_COLOR)
-        self.screen.blit(cc_title, (debug_x, y_offset))
+        cc_title = self.render_text(self.font, "Current CC Values:", TEXT_COLOR)
+        self.blit(cc_title, (debug_x, y_offset))
         y_offset += 25
         
-        for cc_num in sorted(self.cc_values.keys()):
+        for cc_num in self.cc_numbers:
             if y_offset > WINDOW_HEIGHT - 200:  # Don't overflow the screen
                 break
             cc_value = self.cc_values[cc_num]
             color = DEBUG_COLOR if cc_num == self.selected_cc else TEXT_COLOR
-            cc_text = self.small_font.render(f"CC{cc_num}: {cc_value}", True, color)
-            self.screen.blit(cc_text, (debug_x, y_offset))
+            cc_text = self.render_text(self.small_font, f"CC{cc_num}: {cc_value}", color)
+            self.blit(cc_text, (debug_x, y_offset))
             y_offset += 20
         
         # Recent MIDI messages
         y_offset += 20
-        msg_title = self.font.render("Recent MIDI Messages:", True, TEXT_COLOR)
-        self.screen.blit(msg_title, (debug_x, y_offset))
+        msg_title = self.render_text(self.font, "Recent MIDI Messages:", TEXT_COLOR)
+        self.blit(msg_title, (debug_x, y_offset))
         y_offset += 25
         
         for message in self.debug_messages[-10:]:  # Show last 10 messages
             if y_offset > WINDOW_HEIGHT - 30:
                 break
-            msg_text = self.small_font.render(message, True, TEXT_COLOR)
-            self.screen.blit(msg_text, (debug_x, y_offset))
+            # Messages never change, so each is rendered once while it's in the log
+            # rather than churning the shared text cache
+            msg_text = self.debug_message_surfs.get(message)
+            if msg_text is None:
+                msg_text = self.small_font.render(message, True, TEXT_COLOR)
+                self.debug_message_surfs[message] = msg_text
+            self.blit(msg_text, (debug_x, y_offset))
             y_offset += 18
     
     def render_notes_legend(self):
         """Render the notes/color legend outside the graph"""
-        # Get all unique notes that have been played
-        unique_notes = np.unique(self.note_history[self.note_history >= 0])
+        # All notes currently in the history, in pitch order
+        unique_notes = self.seen_notes
         
         if len(unique_notes) == 0:
             return
@@ -361,8 +573,8 @@ class LongToneVisualizer:
         legend_y = 50
         
         # Title
-        legend_title = self.font.render("Notes:", True, TEXT_COLOR)
-        self.screen.blit(legend_title, (legend_x, legend_y))
+        legend_title = self.render_text(self.font, "Notes:", TEXT_COLOR)
+        self.blit(legend_title, (legend_x, legend_y))
         legend_y += 30
         
         # Show each note with its color
@@ -375,17 +587,19 @@ class LongToneVisualizer:
             
             # Draw a colored square
             square_size = 14
-            pygame.draw.rect(self.screen, color, 
-                           (legend_x, legend_y, square_size, square_size))
+            self.mark_drawn(pygame.draw.rect(self.screen, color, 
+                           (legend_x, legend_y, square_size, square_size)), color)
             
             # Draw the note name next to the square
-            note_text = self.small_font.render(f" {note_name}", True, TEXT_COLOR)
-            self.screen.blit(note_text, (legend_x + square_size + 5, legend_y))
+            note_text = self.render_text(self.small_font, f" {note_name}", TEXT_COLOR)
+            self.blit(note_text, (legend_x + square_size + 5, legend_y))
             
             # Move to next line, arrange in two columns if we have many notes
             if i % 8 == 7:  # New column every 8 notes
                 legend_x += 80
                 legend_y = 80
+                if legend_x > WINDOW_WIDTH - 80:  # Don't run off the right edge
+                    break
             else:
                 legend_y += 18
     
@@ -400,50 +614,43 @@ class LongToneVisualizer:
         
         # Draw main button
         color = (120, 120, 160) if is_hovering else button_color
-        pygame.draw.rect(self.screen, color, self.cc_button_rect)
-        pygame.draw.rect(self.screen, TEXT_COLOR, self.cc_button_rect, 2)
+        self.mark_drawn(pygame.draw.rect(self.screen, color, self.cc_button_rect), color)
+        self.mark_drawn(pygame.draw.rect(self.screen, TEXT_COLOR, self.cc_button_rect, 2), TEXT_COLOR)
         
         # Get CC name for display
-        cc_names = {
-            1: "Modulation (CC1)",
-            2: "Breath (CC2)", 
-            7: "Volume (CC7)",
-            11: "Expression (CC11)",
-            74: "Filter (CC74)"
-        }
-        
-        cc_display = cc_names.get(self.selected_cc, f"CC{self.selected_cc}")
+        cc_display = CC_NAMES_LONG.get(self.selected_cc, f"CC{self.selected_cc}")
         current_value = self.cc_values.get(self.selected_cc, 0)
         
         # Button text
         button_text = f"Breath Control: {cc_display}"
-        text_surface = self.small_font.render(button_text, True, TEXT_COLOR)
+        text_surface = self.render_text(self.small_font, button_text, TEXT_COLOR)
         text_rect = text_surface.get_rect(center=(self.cc_button_rect.centerx, self.cc_button_rect.centery - 5))
-        self.screen.blit(text_surface, text_rect)
+        self.blit(text_surface, text_rect)
         
         # Show current value
         value_text = f"Value: {current_value}"
-        value_surface = self.small_font.render(value_text, True, TEXT_COLOR)
+        value_surface = self.render_text(self.small_font, value_text, TEXT_COLOR)
         value_rect = value_surface.get_rect(center=(self.cc_button_rect.centerx, self.cc_button_rect.centery + 8))
-        self.screen.blit(value_surface, value_rect)
+        self.blit(value_surface, value_rect)
         
         # Draw dropdown arrow
         arrow_x = self.cc_button_rect.right - 20
         arrow_y = self.cc_button_rect.centery
         if self.cc_dropdown_open:
             # Up arrow
-            pygame.draw.polygon(self.screen, TEXT_COLOR, [
+            arrow_rect = pygame.draw.polygon(self.screen, TEXT_COLOR, [
                 (arrow_x, arrow_y + 5),
                 (arrow_x + 8, arrow_y - 5),
                 (arrow_x - 8, arrow_y - 5)
             ])
         else:
             # Down arrow
-            pygame.draw.polygon(self.screen, TEXT_COLOR, [
+            arrow_rect = pygame.draw.polygon(self.screen, TEXT_COLOR, [
                 (arrow_x, arrow_y - 5),
                 (arrow_x + 8, arrow_y + 5),
                 (arrow_x - 8, arrow_y + 5)
             ])
+        self.mark_drawn(arrow_rect, self.cc_dropdown_open)
         
         # Draw dropdown options if open
         if self.cc_dropdown_open:
@@ -459,39 +666,66 @@ class LongToneVisualizer:
                 is_option_hovering = option_rect.collidepoint(mouse_pos)
                 
                 if is_current:
-                    pygame.draw.rect(self.screen, (120, 160, 120), option_rect)  # Green for current
+                    option_color = (120, 160, 120)  # Green for current
                 elif is_option_hovering:
-                    pygame.draw.rect(self.screen, (120, 120, 160), option_rect)  # Blue for hover
+                    option_color = (120, 120, 160)  # Blue for hover
                 else:
-                    pygame.draw.rect(self.screen, (60, 60, 80), option_rect)     # Dark for normal
+                    option_color = (60, 60, 80)     # Dark for normal
+                self.mark_drawn(pygame.draw.rect(self.screen, option_color, option_rect), option_color)
                 
-                pygame.draw.rect(self.screen, TEXT_COLOR, option_rect, 1)
+                self.mark_drawn(pygame.draw.rect(self.screen, TEXT_COLOR, option_rect, 1), TEXT_COLOR)
                 
                 # Option text
-                option_display = cc_names.get(cc_num, f"CC{cc_num}")
+                option_display = CC_NAMES_LONG.get(cc_num, f"CC{cc_num}")
                 option_value = self.cc_values.get(cc_num, 0)
                 option_text = f"{option_display} - Value: {option_value}"
                 
-                text_surface = self.small_font.render(option_text, True, TEXT_COLOR)
+                text_surface = self.render_text(self.small_font, option_text, TEXT_COLOR)
                 text_rect = text_surface.get_rect(center=option_rect.center)
-                self.screen.blit(text_surface, text_rect)
+                self.blit(text_surface, text_rect)
                 
                 y_offset += 30
     
+    def blit(self, surf, pos):
+        """Blit a surface to the screen, recording its area for the display update"""
+        rect = self.screen.blit(surf, pos)
+        self.drawn_rects.append((rect, surf))
+        return rect
+    
+    def mark_drawn(self, rect, key):
+        """Record a screen area drawn this frame; key identifies what was drawn there"""
+        self.drawn_rects.append((rect, key))
+    
+    def present(self):
+        """Update only the screen areas that changed since the last frame"""
+        if self.prev_drawn_rects is None:
+            pygame.display.flip()
+        else:
+            # Anything drawn in only one of the two frames has changed
+            current = {(tuple(rect), key) for rect, key in self.drawn_rects}
+            previous = {(tuple(rect), key) for rect, key in self.prev_drawn_rects}
+            pygame.display.update([rect for rect, key in current ^ previous])
+        self.prev_drawn_rects, self.drawn_rects = self.drawn_rects, []
+    
     def render(self):
-        self.screen.fill(BG_COLOR)
+        if self.prev_drawn_rects is None:
+            self.screen.fill(BG_COLOR)
+        else:
+            # Erase only what was drawn last frame
+            for rect, key in self.prev_drawn_rects:
+                self.screen.fill(BG_COLOR, rect)
         
         if self.debug_mode:
             # In debug mode, show smaller main display and debug panel
             main_width = WINDOW_WIDTH - 420
             
             # Render the current note
-            note_text = self.large_font.render(f"Note: {self.note_name}", True, TEXT_COLOR)
-            self.screen.blit(note_text, (50, 50))
+            note_text = self.render_text(self.large_font, f"Note: {self.note_name}", TEXT_COLOR)
+            self.blit(note_text, (50, 50))
             
             # Render the current velocity
-            velocity_text = self.large_font.render(f"Velocity: {self.current_velocity} (CC{self.selected_cc})", True, TEXT_COLOR)
-            self.screen.blit(velocity_text, (50, 120))
+            velocity_text = self.render_text(self.large_font, f"Velocity: {self.current_velocity} (CC{self.selected_cc})", TEXT_COLOR)
+            self.blit(velocity_text, (50, 120))
             
             # Render notes legend
             self.render_notes_legend()
@@ -505,35 +739,39 @@ class LongToneVisualizer:
         else:
             # Normal mode - full width display
             # Render the current note
-            note_text = self.large_font.render(f"Note: {self.note_name}", True, TEXT_COLOR)
-            self.screen.blit(note_text, (50, 50))
+            note_text = self.render_text(self.large_font, f"Note: {self.note_name}", TEXT_COLOR)
+            self.blit(note_text, (50, 50))
             
             # Render the current velocity
-            velocity_text = self.large_font.render(f"Velocity: {self.current_velocity}", True, TEXT_COLOR)
-            self.screen.blit(velocity_text, (50, 120))
+            velocity_text = self.render_text(self.large_font, f"Velocity: {self.current_velocity}", TEXT_COLOR)
+            self.blit(velocity_text, (50, 120))
             
             # Render time held
-            time_text = self.font.render(f"Time: {self.time_held:.2f} seconds", True, TEXT_COLOR)
-            self.screen.blit(time_text, (50, 190))
+            time_text = self.render_text(self.font, f"Time: {self.time_held:.2f} seconds", TEXT_COLOR)
+            self.blit(time_text, (50, 190))
             
             # Render statistics
             stats_y = 230
-            stats_text = self.font.render("Statistics:", True, TEXT_COLOR)
-            self.screen.blit(stats_text, (50, stats_y))
+            stats_text = self.render_text(self.font, "Statistics:", TEXT_COLOR)
+            self.blit(stats_text, (50, stats_y))
             
-            mean_text = self.font.render(f"Mean: {self.stats['mean']:.2f}", True, TEXT_COLOR)
-            self.screen.blit(mean_text, (50, stats_y + 30))
+            mean_text = self.render_text(self.font, f"Mean: {self.stats['mean']:.2f}", TEXT_COLOR)
+            self.blit(mean_text, (50, stats_y + 30))
             
-            std_text = self.font.render(f"Std Dev: {self.stats['std_dev']:.2f}", True, TEXT_COLOR)
-            self.screen.blit(std_text, (50, stats_y + 60))
+            std_text = self.render_text(self.font, f"Std Dev: {self.stats['std_dev']:.2f}", TEXT_COLOR)
+            self.blit(std_text, (50, stats_y + 60))
             
             consistency_score = 100 - min(100, self.stats['std_dev'] * 5) if self.stats['mean'] > 0 else 0
-            score_text = self.font.render(f"Consistency Score: {consistency_score:.1f}%", True, TEXT_COLOR)
-            self.screen.blit(score_text, (50, stats_y + 90))
+            score_text = self.render_text(self.font, f"Consistency Score: {consistency_score:.1f}%", TEXT_COLOR)
+            self.blit(score_text, (50, stats_y + 90))
             
             # Draw the graph
-            graph_surf = self.update_graph()
-            self.screen.blit(graph_surf, (WINDOW_WIDTH // 2 - graph_surf.get_width() // 2, 
+            # Only redraw the graph when its data has changed
+            if self.graph_dirty or self.graph_surf is None:
+                self.graph_surf = self.update_graph()
+                self.graph_dirty = False
+            graph_surf = self.graph_surf
+            self.blit(graph_surf, (WINDOW_WIDTH // 2 - graph_surf.get_width() // 2, 
                                         WINDOW_HEIGHT // 2))
             
             # Render notes legend
@@ -542,19 +780,25 @@ class LongToneVisualizer:
             # Render CC button
             self.render_cc_button()
         
-        # Add instructions
-        if self.debug_mode:
-            instructions = self.small_font.render("ESC: quit | D: toggle debug | C: clear history | 1-9: select CC", True, TEXT_COLOR)
+        # Add instructions, or the MIDI error in their place if input has stopped
+        if self.midi_error is not None:
+            instructions = self.render_text(self.font, f"MIDI input error: {self.midi_error} (press ESC to quit)", ERROR_COLOR)
+        elif self.debug_mode:
+            instructions = self.render_text(self.small_font, "ESC: quit | D: toggle debug | C: clear history | 1-9: select CC", TEXT_COLOR)
         else:
-            instructions = self.font.render("Press ESC to quit, D for debug, C to clear history", True, TEXT_COLOR)
-        self.screen.blit(instructions, (50, WINDOW_HEIGHT - 40))
+            instructions = self.render_text(self.font, "Press ESC to quit, D for debug, C to clear history", TEXT_COLOR)
+        self.blit(instructions, (50, WINDOW_HEIGHT - 40))
         
-        pygame.display.flip()
+        self.present()
     
     def run(self):
         running = True
         last_midi_check = 0
         
+        # Start reading MIDI input in the background
+        self.midi_running = True
+        self.midi_thread.start()
+        
         while running:
             current_time = pygame.time.get_ticks()
             
@@ -562,6 +806,9 @@ class LongToneVisualizer:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.VIDEOEXPOSE:
+                    # The window contents were lost, so redraw all of it
+                    self.prev_drawn_rects = None
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
@@ -571,12 +818,21 @@ class LongToneVisualizer:
                             self.add_debug_message("Debug mode enabled")
                         else:
                             self.debug_messages.clear()
+                            self.debug_message_surfs.clear()
                     elif event.key == pygame.K_c:
                         # Clear history
-                        self.velocity_history = np.zeros(HISTORY_LENGTH)
-                        self.note_history = np.full(HISTORY_LENGTH, -1)
+                        self.velocity_history.fill(0)
+                        self.note_history.fill(-1)
+                        self.hist_idx = 0
+                        self.graph_dirty = True
                         self.note_colors.clear()
+                        self.note_counts[:] = [0] * 128
+                        self.seen_notes.clear()
                         self.color_index = 0
+                        # A held note keeps being drawn, so give it a color again
+                        if self.is_note_active:
+                            self.note_colors[self.current_note] = NOTE_COLORS[0]
+                            self.color_index = 1
                         if self.debug_mode:
                             self.add_debug_message("History cleared")
                     # Number keys 1-9 to select CC controller
@@ -625,6 +881,8 @@ class LongToneVisualizer:
             self.clock.tick(UPDATE_RATE)
         
         # Clean up
+        self.midi_running = False
+        self.midi_thread.join()
         self.midi_input.close()
         pygame.midi.quit()
         pygame.quit()